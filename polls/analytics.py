@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+
+from .models import ANON_USERNAME
+
+
+# Choice ids an answer selected are the keys of its `data` object, a key set to
+# false or null is not a selection. Selections are made distinct per user before
+# the join, so repeated answers of a user do not multiply rows. Answers of the
+# shared anonymous account come from different people and can not be paired, so
+# they are left out. Grouping sets give the cells together with row, column and
+# grand totals of distinct respondents.
+CROSSTAB_SQL = """
+WITH selected1 AS (
+    SELECT DISTINCT a.user_id, k.key
+    FROM polls_answer a
+    {group_join}
+    CROSS JOIN LATERAL jsonb_each(CASE WHEN jsonb_typeof(a.data) = 'object' THEN a.data ELSE '{{}}' END) k
+    WHERE a.question_id = %(q1)s AND k.value NOT IN ('false'::jsonb, 'null'::jsonb)
+      AND a.user_id NOT IN (SELECT id FROM auth_user WHERE username = %(anon)s)
+), selected2 AS (
+    SELECT DISTINCT a.user_id, k.key
+    FROM polls_answer a
+    CROSS JOIN LATERAL jsonb_each(CASE WHEN jsonb_typeof(a.data) = 'object' THEN a.data ELSE '{{}}' END) k
+    WHERE a.question_id = %(q2)s AND k.value NOT IN ('false'::jsonb, 'null'::jsonb)
+      AND a.user_id NOT IN (SELECT id FROM auth_user WHERE username = %(anon)s)
+)
+SELECT s1.key, s2.key, COUNT(DISTINCT s1.user_id)
+FROM selected1 s1
+JOIN selected2 s2 ON s2.user_id = s1.user_id
+GROUP BY GROUPING SETS ((s1.key, s2.key), (s1.key), (s2.key), ())
+"""
+
+GROUP_JOIN_SQL = 'JOIN auth_user_groups ug ON ug.user_id = a.user_id AND ug.group_id = %(group)s'
+
+# Latest answer ids of both questions, each read from the end of polls_answer_question_idx.
+LATEST_ANSWERS_SQL = """
+SELECT (SELECT max(id) FROM polls_answer WHERE question_id = %(q1)s),
+       (SELECT max(id) FROM polls_answer WHERE question_id = %(q2)s)
+"""
+
+# bounds staleness after edits or deletions of answers, which do not change the latest ids
+CROSSTAB_CACHE_TIMEOUT = 10 * 60
+
+
+def latest_answers(q1_id, q2_id):
+    """Latest answer ids of both questions, a new answer to either changes them.
+
+    Nothing is written when answers are submitted, the cache key is derived
+    from this instead.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(LATEST_ANSWERS_SQL, {'q1': q1_id, 'q2': q2_id})
+        return cursor.fetchone()
+
+
+def crosstab_counts(q1_id, q2_id, group_id=None):
+    """Returns {(choice1_id, choice2_id): respondents} where either id is None for totals."""
+    sql = CROSSTAB_SQL.format(group_join=GROUP_JOIN_SQL if group_id is not None else '')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'q1': q1_id, 'q2': q2_id, 'group': group_id, 'anon': ANON_USERNAME})
+        rows = cursor.fetchall()
+    return {(key1, key2): count for key1, key2, count in rows}
+
+
+def cached_crosstab_counts(q1_id, q2_id, group_id=None):
+    latest1, latest2 = latest_answers(q1_id, q2_id)
+    key = 'polls:crosstab:{}:{}:{}:{}:{}'.format(q1_id, latest1, q2_id, latest2, group_id)
+    counts = cache.get(key)
+    if counts is None:
+        counts = crosstab_counts(q1_id, q2_id, group_id)
+        cache.set(key, counts, CROSSTAB_CACHE_TIMEOUT)
+    return counts
+
+
+def crosstab(poll, q1_number, q2_number, group_id=None):
+    """Cross-tabulation of the choices of question q1 (rows) by the choices of question q2 (columns)."""
+    questions = list(poll.questions.all())
+    if not (0 < q1_number <= len(questions) and 0 < q2_number <= len(questions)):
+        raise Http404
+    question1, question2 = questions[q1_number - 1], questions[q2_number - 1]
+
+    counts = cached_crosstab_counts(question1.id, question2.id, group_id)
+    choices1 = list(question1.choices.all())
+    choices2 = list(question2.choices.all())
+
+    def describe(question, number, choices):
+        return {'id': question.id, 'number': number, 'text': question.text,
+                'choices': [{'id': c.id, 'number': i + 1, 'text': c.text} for i, c in enumerate(choices)]}
+
+    return {
+        'poll_id': poll.id,
+        'group_id': group_id,
+        'rows': describe(question1, q1_number, choices1),
+        'columns': describe(question2, q2_number, choices2),
+        'counts': [[counts.get((str(c1.id), str(c2.id)), 0) for c2 in choices2] for c1 in choices1],
+        'row_totals': [counts.get((str(c1.id), None), 0) for c1 in choices1],
+        'column_totals': [counts.get((None, str(c2.id)), 0) for c2 in choices2],
+        'respondents': counts.get((None, None), 0),
+    }
@@ -0,0 +1,73 @@
+from django.db import connection, transaction
+
+
+# Each statement removes at most `batch_size` rows and runs in its own
+# transaction, so locks are short and no rows are loaded into Python.
+POLL_BATCHES = [
+    ('answers', 'DELETE FROM polls_answer WHERE id IN ('
+                'SELECT a.id FROM polls_answer a JOIN polls_question q ON q.id = a.question_id '
+                'WHERE q.poll_id = %s LIMIT %s)'),
+    ('choices', 'DELETE FROM polls_choice WHERE id IN ('
+                'SELECT c.id FROM polls_choice c JOIN polls_question q ON q.id = c.question_id '
+                'WHERE q.poll_id = %s LIMIT %s)'),
+    ('questions', 'DELETE FROM polls_question WHERE id IN ('
+                  'SELECT id FROM polls_question WHERE poll_id = %s LIMIT %s)'),
+]
+
+QUESTION_BATCHES = [
+    ('answers', 'DELETE FROM polls_answer WHERE id IN ('
+                'SELECT id FROM polls_answer WHERE question_id = %s LIMIT %s)'),
+    ('choices', 'DELETE FROM polls_choice WHERE id IN ('
+                'SELECT id FROM polls_choice WHERE question_id = %s LIMIT %s)'),
+]
+
+# The final transaction locks the rows first, so rows referencing them can not
+# be inserted any more, then removes what was added during the batches and the
+# rows. Answers and choices reference questions, so the poll's questions are
+# locked as well as the poll.
+POLL_FINAL = [
+    'SELECT id FROM polls_poll WHERE id = %s FOR UPDATE',
+    'SELECT id FROM polls_question WHERE poll_id = %s FOR UPDATE',
+    'DELETE FROM polls_answer WHERE question_id IN (SELECT id FROM polls_question WHERE poll_id = %s)',
+    'DELETE FROM polls_choice WHERE question_id IN (SELECT id FROM polls_question WHERE poll_id = %s)',
+    'DELETE FROM polls_question WHERE poll_id = %s',
+    'DELETE FROM polls_poll WHERE id = %s',
+]
+
+QUESTION_FINAL = [
+    'SELECT id FROM polls_question WHERE id = %s FOR UPDATE',
+    'DELETE FROM polls_answer WHERE question_id = %s',
+    'DELETE FROM polls_choice WHERE question_id = %s',
+    'DELETE FROM polls_question WHERE id = %s',
+]
+
+
+def delete_in_batches(batches, final, object_id, batch_size, progress=None):
+    """Runs each batch statement until it deletes nothing, reports totals to `progress(name, deleted)`.
+
+    The `final` statements then run in one transaction.
+    """
+    with connection.cursor() as cursor:
+        for name, sql in batches:
+            deleted = 0
+            while True:
+                cursor.execute(sql, [object_id, batch_size])
+                if cursor.rowcount <= 0:
+                    break
+                deleted += cursor.rowcount
+                if progress:
+                    progress(name, deleted)
+
+        with transaction.atomic():
+            for sql in final:
+                cursor.execute(sql, [object_id])
+
+
+def purge_poll(poll_id, batch_size=5000, progress=None):
+    """Removes a poll with its questions, choices and answers, bypassing the cascade collector."""
+    delete_in_batches(POLL_BATCHES, POLL_FINAL, poll_id, batch_size, progress)
+
+
+def purge_question(question_id, batch_size=5000, progress=None):
+    """Removes a question with its choices and answers, bypassing the cascade collector."""
+    delete_in_batches(QUESTION_BATCHES, QUESTION_FINAL, question_id, batch_size, progress)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min
+
+from polls.models import Answer
+
+
+class Command(BaseCommand):
+    help = 'Fills Answer.search_vector for existing answers in batches of ids.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--only-missing', action='store_true',
+                            help='Skip answers which already have a search vector.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Answer.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write('No answers to backfill.')
+            return
+
+        # touching search_vector fires the polls_answer_search_update trigger,
+        # which recomputes it from the answer data; answers without text
+        # (choice answers) are only touched to clear a stale vector
+        sql = 'UPDATE polls_answer SET search_vector = NULL WHERE id >= %s AND id < %s'
+        if options['only_missing']:
+            sql += ' AND search_vector IS NULL AND polls_answer_text(data) IS NOT NULL'
+        else:
+            sql += ' AND (search_vector IS NOT NULL OR polls_answer_text(data) IS NOT NULL)'
+
+        updated = 0
+        with connection.cursor() as cursor:
+            for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+                cursor.execute(sql, [start, start + batch_size])
+                updated += cursor.rowcount
+                self.stdout.write('Answers up to id {}: {} updated'.format(
+                    min(start + batch_size - 1, bounds['high']), updated))
+
+        self.stdout.write(self.style.SUCCESS('Backfilled {} answers.'.format(updated)))
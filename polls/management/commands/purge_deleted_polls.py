@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from polls.deletion import purge_poll, purge_question
+from polls.models import Poll, Question
+
+
+class Command(BaseCommand):
+    help = 'Removes soft-deleted polls and questions with their choices and answers in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--interval', type=int,
+                            help='Keep running and look for deleted polls every INTERVAL seconds.')
+
+    def handle(self, *args, **options):
+        if not options['interval']:
+            self.purge(options['batch_size'])
+            return
+
+        # as a long running worker, a failed pass is reported and retried on the next one
+        while True:
+            try:
+                self.purge(options['batch_size'])
+            except DatabaseError as e:
+                self.stderr.write('Purge failed: {}'.format(e))
+            time.sleep(options['interval'])
+
+    def progress(self, name, deleted):
+        self.stdout.write('  {}: {} deleted'.format(name, deleted))
+
+    def purge(self, batch_size):
+        # questions of deleted polls are removed together with their poll
+        question_ids = list(Question.all_objects.filter(deleted_at__isnull=False, poll__deleted_at__isnull=True)
+                            .order_by('deleted_at').values_list('pk', flat=True))
+        for question_id in question_ids:
+            self.stdout.write('Purging question {}'.format(question_id))
+            purge_question(question_id, batch_size, self.progress)
+            self.stdout.write(self.style.SUCCESS('Question {} purged.'.format(question_id)))
+
+        poll_ids = list(Poll.all_objects.filter(deleted_at__isnull=False)
+                        .order_by('deleted_at').values_list('pk', flat=True))
+        for poll_id in poll_ids:
+            self.stdout.write('Purging poll {}'.format(poll_id))
+            purge_poll(poll_id, batch_size, self.progress)
+            self.stdout.write(self.style.SUCCESS('Poll {} purged.'.format(poll_id)))
@@ -0,0 +1,50 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Text of an answer is the concatenation of the values of its `data` object.
+CREATE_SQL = """
+CREATE FUNCTION polls_answer_text(data jsonb) RETURNS text AS $$
+    SELECT CASE WHEN jsonb_typeof(data) = 'object'
+        THEN (SELECT coalesce(string_agg(value, ' '), '') FROM jsonb_each_text(data))
+        ELSE '' END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE FUNCTION polls_answer_search_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('simple', polls_answer_text(NEW.data));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER polls_answer_search_update
+    BEFORE INSERT OR UPDATE OF data, search_vector ON polls_answer
+    FOR EACH ROW EXECUTE PROCEDURE polls_answer_search_update();
+"""
+
+DROP_SQL = """
+DROP TRIGGER IF EXISTS polls_answer_search_update ON polls_answer;
+DROP FUNCTION IF EXISTS polls_answer_search_update();
+DROP FUNCTION IF EXISTS polls_answer_text(jsonb);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0002_auto_20220121_1422'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='polls_answer_search_idx'),
+        ),
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
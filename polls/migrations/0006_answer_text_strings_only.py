@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+# Only string values are answer text, choice answers hold true/false and get
+# no search vector, so they add nothing to polls_answer_search_idx.
+FORWARD_SQL = """
+CREATE OR REPLACE FUNCTION polls_answer_text(data jsonb) RETURNS text AS $$
+    SELECT CASE WHEN jsonb_typeof(data) = 'object'
+        THEN (SELECT string_agg(value #>> '{}', ' ') FROM jsonb_each(data) WHERE jsonb_typeof(value) = 'string')
+        END;
+$$ LANGUAGE sql IMMUTABLE;
+"""
+
+BACKWARD_SQL = """
+CREATE OR REPLACE FUNCTION polls_answer_text(data jsonb) RETURNS text AS $$
+    SELECT CASE WHEN jsonb_typeof(data) = 'object'
+        THEN (SELECT coalesce(string_agg(value, ' '), '') FROM jsonb_each_text(data))
+        ELSE '' END;
+$$ LANGUAGE sql IMMUTABLE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_question_deleted_at'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FORWARD_SQL, BACKWARD_SQL),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
+from django.utils import timezone
 from datetime import datetime, timedelta
 from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 TEXT = 'TEXT'
@@ -9,6 +12,34 @@ CHOICE_MULTIPLE = 'CHOICE_MULTIPLE'
 
 QUESTION_TYPES = [(TEXT, 'text'), (CHOICE_SINGLE, 'choice_single'), (CHOICE_MULTIPLE, 'choice_multiple')]
 
+# shared account of anonymous answers
+ANON_USERNAME = 'anon'
+
+# text search configuration of Answer.search_vector, answers may be in any language
+SEARCH_CONFIG = 'simple'
+
+
+class PollManager(models.Manager):
+    """Hides soft-deleted polls, they are removed later by the purge_deleted_polls command."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class QuestionManager(models.Manager):
+    """Hides soft-deleted questions and questions of soft-deleted polls."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True, poll__deleted_at__isnull=True)
+
+
+class ChoiceManager(models.Manager):
+    """Hides choices of soft-deleted questions and polls."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(question__deleted_at__isnull=True,
+                                             question__poll__deleted_at__isnull=True)
+
 
 class Poll(models.Model):
     title = models.CharField(max_length=100)  # blank = False?
@@ -16,10 +47,18 @@ class Poll(models.Model):
     dt_close = models.DateTimeField(blank=False, default=datetime.now()+timedelta(days=14))
     owner = models.ForeignKey('auth.User', related_name='polls', on_delete=models.CASCADE)
     description = models.TextField()
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
+    objects = PollManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ['dt_close']
 
+    def soft_delete(self):
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at'])
+
 
 class Question(models.Model):
     poll = models.ForeignKey(Poll, related_name='questions', on_delete=models.CASCADE)
@@ -27,6 +66,14 @@ class Question(models.Model):
     type = models.CharField(choices=QUESTION_TYPES, default='text', max_length=50)
     users = models.ManyToManyField('auth.User', through='Answer')  # rel_name ?
     owner = models.ForeignKey('auth.User', related_name='questions', on_delete=models.CASCADE)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
+    objects = QuestionManager()
+    all_objects = models.Manager()
+
+    def soft_delete(self):
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at'])
 
 
 class Choice(models.Model):
@@ -34,8 +81,17 @@ class Choice(models.Model):
     owner = models.ForeignKey('auth.User', related_name='choices', on_delete=models.CASCADE)
     text = models.CharField(max_length=200, null=True)
 
+    objects = ChoiceManager()
+    all_objects = models.Manager()
+
 
 class Answer(models.Model):
     question = models.ForeignKey(Question, related_name='answers', on_delete=models.CASCADE)
     user = models.ForeignKey('auth.User', related_name='answers', on_delete=models.CASCADE)
     data = JSONField(blank=True, default=dict)
+    # maintained by the polls_answer_search_update trigger, see migration 0003
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [GinIndex(fields=['search_vector'], name='polls_answer_search_idx'),
+                   models.Index(fields=['question', 'id'], name='polls_answer_question_idx')]
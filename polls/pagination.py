@@ -0,0 +1,71 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class StandardPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class SearchCursorPagination(BasePagination):
+    """Keyset pagination on the integer `rank_key` annotation and id, see views.AnswerSearch.
+
+    Both keys are exact, so the next page starts right after the last row
+    without scanning rows of earlier pages, even when many answers share a rank.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by('-rank_key', '-id')
+
+        cursor = self.decode_cursor(request)
+        if cursor:
+            rank_key, pk = cursor
+            queryset = queryset.filter(Q(rank_key__lt=rank_key) | Q(rank_key=rank_key, id__lt=pk))
+
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            rank_key, pk = b64decode(encoded.encode('ascii')).decode('ascii').split(':')
+            return int(rank_key), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = b64encode('{}:{}'.format(last.rank_key, last.pk).encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from polls.models import Poll, Question, Choice, Answer
+from polls.models import Poll, Question, Choice, Answer, ANON_USERNAME
 
 
 class ChoiceSerializer(serializers.ModelSerializer):
@@ -82,13 +82,14 @@ class PollSerializer(serializers.ModelSerializer):
 
 
 class UserSerializer(serializers.ModelSerializer):
-    polls = serializers.PrimaryKeyRelatedField(many=True, queryset=Poll.objects.all())
-    questions = serializers.PrimaryKeyRelatedField(many=True, queryset=Question.objects.all())
-    choices = serializers.PrimaryKeyRelatedField(many=True, queryset=Choice.objects.all())
+    # counts are annotated on the queryset, see views.UserList
+    polls_count = serializers.IntegerField(read_only=True)
+    questions_count = serializers.IntegerField(read_only=True)
+    choices_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'polls', 'questions', 'choices']
+        fields = ['id', 'username', 'polls_count', 'questions_count', 'choices_count']
 
 
 class AnswerSerializer(serializers.ModelSerializer):
@@ -104,7 +105,14 @@ class AnswerSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         is_anon = bool(validated_data.pop('is_anon'))
         if is_anon:
-            validated_data['user_id'] = User.objects.get(username="anon")
+            validated_data['user_id'] = User.objects.get(username=ANON_USERNAME)
 
         answer = Answer.objects.create(**validated_data)
         return answer
+
+
+class AnswerSearchSerializer(AnswerSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(AnswerSerializer.Meta):
+        fields = AnswerSerializer.Meta.fields + ['rank']
@@ -1,3 +1,252 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from polls.models import Poll, Question, Choice, Answer, TEXT, CHOICE_SINGLE, ANON_USERNAME
+
+
+def make_poll(owner, choices=2, question_type=TEXT, questions=1):
+    poll = Poll.objects.create(title='Poll', description='', owner=owner)
+    for i in range(questions):
+        question = Question.objects.create(poll=poll, text='Question {}'.format(i + 1),
+                                           type=question_type, owner=owner)
+        for j in range(choices):
+            Choice.objects.create(question=question, text='Choice {}'.format(j + 1), owner=owner)
+    return poll
+
+
+class UserTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.author = User.objects.create_user('author')
+        self.poll = make_poll(self.author, choices=2)
+        self.client.force_authenticate(self.admin)
+
+    def test_list_has_counts(self):
+        response = self.client.get('/users/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        users = {u['username']: u for u in response.data['results']}
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual((users['author']['polls_count'], users['author']['questions_count'],
+                          users['author']['choices_count']), (1, 1, 2))
+        self.assertEqual((users['admin']['polls_count'], users['admin']['questions_count'],
+                          users['admin']['choices_count']), (0, 0, 0))
+
+    def test_detail_has_counts(self):
+        response = self.client.get('/users/{}'.format(self.author.pk))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['choices_count'], 2)
+        self.assertNotIn('choices', response.data)
+
+    def test_related_lists_are_paginated(self):
+        poll_ids = [self.poll.pk] + [make_poll(self.author).pk for _ in range(2)]
+
+        response = self.client.get('/users/{}/polls/?page_size=2'.format(self.author.pk))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'], poll_ids[:2])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'], poll_ids[2:])
+
+        response = self.client.get('/users/{}/choices/'.format(self.author.pk))
+        self.assertEqual(response.data['count'], 6)
+
+    def test_related_list_of_unknown_user(self):
+        response = self.client.get('/users/0/polls/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AnswerSearchTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.user = User.objects.create_user('user')
+        self.poll = make_poll(self.admin, choices=1)
+        self.question = self.poll.questions.get()
+        self.choice = self.question.choices.get()
+        self.client.force_authenticate(self.admin)
+
+    def answer(self, text):
+        return Answer.objects.create(question=self.question, user=self.user, data={str(self.choice.id): text})
+
+    def search(self, query, **params):
+        params['q'] = query
+        return self.client.get('/polls/{}/questions/1/answers/search'.format(self.poll.pk), params)
+
+    def result_ids(self, response):
+        return [a['id'] for a in response.data['results']]
+
+    def test_trigger_maintains_search_vector(self):
+        answer = self.answer('the quick brown fox')
+        self.assertEqual(self.result_ids(self.search('fox')), [answer.pk])
+
+        answer.data = {str(self.choice.id): 'a lazy dog'}
+        answer.save()
+        self.assertEqual(self.result_ids(self.search('fox')), [])
+        self.assertEqual(self.result_ids(self.search('dog')), [answer.pk])
+
+    def test_choice_answers_are_not_indexed(self):
+        answer = Answer.objects.create(question=self.question, user=self.user, data={str(self.choice.id): True})
+        answer.refresh_from_db()
+        self.assertIsNone(answer.search_vector)
+        self.assertEqual(self.result_ids(self.search('true')), [])
+
+    def test_phrase_search(self):
+        matching = self.answer('brown fox')
+        self.answer('fox brown')
+        self.assertEqual(self.result_ids(self.search('brown fox', type='phrase')), [matching.pk])
+
+    def test_results_are_ranked(self):
+        once = self.answer('fox and hound')
+        twice = self.answer('fox chases fox')
+        response = self.search('fox')
+        self.assertEqual(self.result_ids(response), [twice.pk, once.pk])
+        self.assertGreater(response.data['results'][0]['rank'], response.data['results'][1]['rank'])
+
+    def test_pagination_with_tied_ranks(self):
+        answers = [self.answer('same answer') for _ in range(5)]
+        self.answer('something else')
+
+        seen = []
+        response = self.search('answer', page_size=2)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += self.result_ids(response)
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, sorted((a.pk for a in answers), reverse=True))
+
+    def test_query_is_required(self):
+        response = self.search('')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CrosstabTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.poll = make_poll(self.admin, choices=2, question_type=CHOICE_SINGLE, questions=2)
+        self.q1, self.q2 = self.poll.questions.all()
+        self.users = [User.objects.create_user('user{}'.format(i)) for i in range(3)]
+        # (choice number of q1, choice number of q2) of each user
+        for user, (c1, c2) in zip(self.users, [(1, 1), (1, 2), (2, 2)]):
+            self.answer(user, self.q1, c1)
+            self.answer(user, self.q2, c2)
+        # a repeated answer must not be counted twice
+        self.answer(self.users[0], self.q1, 1)
+        self.client.force_authenticate(self.admin)
+
+    @staticmethod
+    def answer(user, question, choice_number):
+        choice = question.choices.all()[choice_number - 1]
+        Answer.objects.create(question=question, user=user, data={str(choice.id): True})
+
+    def crosstab(self, **params):
+        params.update(q1=1, q2=2)
+        response = self.client.get('/polls/{}/analytics/crosstab'.format(self.poll.pk), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_cells_and_totals(self):
+        data = self.crosstab()
+        self.assertEqual(data['counts'], [[1, 1], [0, 1]])
+        self.assertEqual(data['row_totals'], [2, 1])
+        self.assertEqual(data['column_totals'], [1, 2])
+        self.assertEqual(data['respondents'], 3)
+
+    def test_group_filter(self):
+        group = Group.objects.create(name='cohort')
+        group.user_set.add(self.users[0], self.users[2])
+        data = self.crosstab(group=group.pk)
+        self.assertEqual(data['counts'], [[1, 0], [0, 1]])
+        self.assertEqual(data['respondents'], 2)
+
+    def test_cache_is_invalidated_by_new_answers(self):
+        self.assertEqual(self.crosstab()['respondents'], 3)
+        user = User.objects.create_user('late')
+        self.answer(user, self.q1, 2)
+        self.answer(user, self.q2, 1)
+        data = self.crosstab()
+        self.assertEqual(data['counts'], [[1, 1], [1, 1]])
+        self.assertEqual(data['respondents'], 4)
+
+    def test_anonymous_answers_are_not_paired(self):
+        # two different people answering anonymously, one per question
+        anon = User.objects.create_user(ANON_USERNAME)
+        self.answer(anon, self.q1, 2)
+        self.answer(anon, self.q2, 1)
+        data = self.crosstab()
+        self.assertEqual(data['counts'], [[1, 1], [0, 1]])
+        self.assertEqual(data['respondents'], 3)
+
+    def test_unknown_question(self):
+        response = self.client.get('/polls/{}/analytics/crosstab'.format(self.poll.pk), {'q1': 1, 'q2': 3})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DeletionTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.poll = make_poll(self.admin, choices=2, questions=2)
+        self.question = self.poll.questions.all()[0]
+        self.choice = self.question.choices.all()[0]
+        self.answers = [Answer.objects.create(question=question, user=self.admin,
+                                              data={str(question.choices.all()[0].id): 'some text'})
+                        for question in self.poll.questions.all() for _ in range(3)]
+        self.client.force_authenticate(self.admin)
+
+    def purge(self):
+        call_command('purge_deleted_polls', batch_size=2, stdout=StringIO())
+
+    def test_deleted_poll_is_hidden(self):
+        response = self.client.delete('/polls/{}'.format(self.poll.pk))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(self.client.get('/polls/').data, [])
+        for url in ['/polls/{}', '/polls/{}/questions/', '/polls/{}/questions/1',
+                    '/polls/{}/questions/1/choices/', '/polls/{}/answers/search?q=text',
+                    '/polls/{}/analytics/crosstab?q1=1&q2=2']:
+            response = self.client.get(url.format(self.poll.pk))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, url)
+
+        response = self.client.post('/polls/{}/questions/'.format(self.poll.pk),
+                                    {'text': 'Late question', 'choices': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post('/submit/{}'.format(self.question.pk),
+                                    {'data': {str(self.choice.id): 'late answer'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.assertEqual(self.client.get('/submit/results/').data, [])
+        user = self.client.get('/users/{}'.format(self.admin.pk)).data
+        self.assertEqual((user['polls_count'], user['questions_count'], user['choices_count']), (0, 0, 0))
+        for relation in ['polls', 'questions', 'choices']:
+            response = self.client.get('/users/{}/{}/'.format(self.admin.pk, relation))
+            self.assertEqual(response.data['count'], 0, relation)
+
+    def test_purge_removes_poll(self):
+        other = make_poll(self.admin)
+        self.client.delete('/polls/{}'.format(self.poll.pk))
+        self.purge()
+
+        self.assertFalse(Poll.all_objects.filter(pk=self.poll.pk).exists())
+        self.assertFalse(Question.all_objects.filter(poll_id=self.poll.pk).exists())
+        self.assertFalse(Choice.all_objects.filter(question__poll_id=self.poll.pk).exists())
+        self.assertFalse(Answer.objects.filter(question__poll_id=self.poll.pk).exists())
+        self.assertTrue(Poll.objects.filter(pk=other.pk).exists())
+
+    def test_deleted_question_is_hidden_and_purged(self):
+        response = self.client.delete('/polls/{}/questions/1'.format(self.poll.pk))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get('/polls/{}/questions/'.format(self.poll.pk))
+        self.assertNotIn(self.question.pk, [q['id'] for q in response.data])
+        self.assertEqual(len(self.client.get('/submit/results/').data), 3)
+
+        self.purge()
+        self.assertFalse(Question.all_objects.filter(pk=self.question.pk).exists())
+        self.assertFalse(Answer.objects.filter(question_id=self.question.pk).exists())
+        self.assertEqual(Question.objects.filter(poll=self.poll).count(), 1)
@@ -4,6 +4,9 @@ from . import views
 urlpatterns = [
     path('users/', views.UserList.as_view()),
     path('users/<int:pk>', views.UserDetail.as_view()),
+    path('users/<int:pk>/polls/', views.UserPollList.as_view()),
+    path('users/<int:pk>/questions/', views.UserQuestionList.as_view()),
+    path('users/<int:pk>/choices/', views.UserChoiceList.as_view()),
     path('polls/', views.PollList.as_view()),
     path('polls/<int:pk>', views.PollDetail.as_view()),
     path('polls/<int:poll_id>/questions/', views.PollQuestionList.as_view()),
@@ -12,6 +15,9 @@ urlpatterns = [
          views.QuestionChoiceList.as_view()),
     path('polls/<int:poll_id>/questions/<int:question_number>/choices/<int:choice_number>',
          views.QuestionChoiceDetail.as_view()),
+    path('polls/<int:poll_id>/answers/search', views.AnswerSearch.as_view()),
+    path('polls/<int:poll_id>/questions/<int:question_number>/answers/search', views.AnswerSearch.as_view()),
+    path('polls/<int:poll_id>/analytics/crosstab', views.PollCrosstab.as_view()),
     path('submit/<int:question_id>', views.AnswerDetail.as_view()),
     path('submit/results/', views.AnswerList.as_view())
 ]
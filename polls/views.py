@@ -1,6 +1,9 @@
 from datetime import datetime
 
 from django.contrib.auth.models import User, AnonymousUser
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
 from django.utils import timezone
 from django.http import Http404
 
@@ -9,26 +12,76 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
 
-from .models import Poll, Question, Answer
-from .serializers import PollSerializer, QuestionSerializer, ChoiceSerializer, UserSerializer, AnswerSerializer
+from .models import Poll, Question, Choice, Answer, TEXT, SEARCH_CONFIG
+from .serializers import PollSerializer, QuestionSerializer, ChoiceSerializer, UserSerializer, AnswerSerializer, \
+    AnswerSearchSerializer
 from .permissions import IsOwnerOrReadOnly
+from .pagination import StandardPagination, SearchCursorPagination
+from .analytics import crosstab
+
+
+def owned_count(model):
+    """Number of `model` rows owned by the outer user, as a correlated subquery.
+
+    Subqueries keep the counts independent of each other, unlike several
+    Count() joins in one query, which multiply rows.
+    """
+    owned = model.objects.filter(owner=OuterRef('pk')).order_by().values('owner')
+    return Coalesce(Subquery(owned.annotate(count=Count('pk')).values('count'), output_field=IntegerField()), 0)
+
+
+def users_with_counts():
+    return User.objects.annotate(polls_count=owned_count(Poll),
+                                 questions_count=owned_count(Question),
+                                 choices_count=owned_count(Choice)).order_by('pk')
 
 
 class UserList(generics.ListAPIView):
     permission_classes = [permissions.IsAdminUser,
                           IsOwnerOrReadOnly]
-    queryset = User.objects.all()
+    queryset = users_with_counts()
     serializer_class = UserSerializer
+    pagination_class = StandardPagination
 
 
 class UserDetail(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAdminUser,
                           IsOwnerOrReadOnly]
-    queryset = User.objects.all()
+    queryset = users_with_counts()
     serializer_class = UserSerializer
 
 
+class UserRelatedList(generics.ListAPIView):
+    """Paginated ids of the objects of `model` owned by a user."""
+    permission_classes = [permissions.IsAdminUser,
+                          IsOwnerOrReadOnly]
+    pagination_class = StandardPagination
+    model = None
+
+    def get_queryset(self):
+        if not User.objects.filter(pk=self.kwargs['pk']).exists():
+            raise Http404
+        return self.model.objects.filter(owner_id=self.kwargs['pk']).order_by('pk').values_list('pk', flat=True)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(list(page))
+
+
+class UserPollList(UserRelatedList):
+    model = Poll
+
+
+class UserQuestionList(UserRelatedList):
+    model = Question
+
+
+class UserChoiceList(UserRelatedList):
+    model = Choice
+
+
 class PollList(generics.ListCreateAPIView):
     queryset = Poll.objects.all()
     serializer_class = PollSerializer
@@ -75,6 +128,10 @@ class PollDetail(generics.RetrieveUpdateDestroyAPIView):
         if self.request.user.is_staff:
             serializer.save(owner=self.request.user)
 
+    def perform_destroy(self, instance):
+        # answers are removed later in batches by the purge_deleted_polls command
+        instance.soft_delete()
+
 
 class PollQuestionList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly,
@@ -90,6 +147,9 @@ class PollQuestionList(APIView):
 
     @staticmethod
     def post(request, poll_id):
+        if not Poll.objects.filter(pk=poll_id).exists():
+            raise Http404
+
         serializer = QuestionSerializer(data=request.data)
         if serializer.is_valid():
             serializer.validated_data['poll_id'] = poll_id
@@ -119,7 +179,13 @@ class PollQuestionDetail(APIView):
         return Response(serializer.data)
 
     def delete(self, request, poll_id, question_number):
-        self.get_question(poll_id, question_number).delete()
+        try:
+            poll = Poll.objects.get(pk=poll_id)
+        except Poll.DoesNotExist:
+            raise Http404
+
+        # answers are removed later in batches by the purge_deleted_polls command
+        self.get_question(poll, question_number).soft_delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def patch(self, request, poll_id, question_number):
@@ -173,7 +239,7 @@ class QuestionChoiceDetail(APIView):
             question = PollQuestionDetail.get_question(poll, question_number)
             return question.choices.all()[choice_number - 1]
         except IndexError:
-            return Http404
+            raise Http404
 
     def get(self, request, poll_id, question_number, choice_number):
         poll, status_code = PollDetail.validate_poll_request(request.user, poll_id)
@@ -185,7 +251,13 @@ class QuestionChoiceDetail(APIView):
         return Response(serializer.data)
 
     def delete(self, request, poll_id, question_number, choice_number):
-        self.get_choice(poll_id, question_number, choice_number).delete()
+        try:
+            poll = Poll.objects.get(pk=poll_id)
+        except Poll.DoesNotExist:
+            raise Http404
+
+        # answers refer to choices only by id inside their data, nothing cascades
+        self.get_choice(poll, question_number, choice_number).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def patch(self, request, poll_id, question_number, choice_number):
@@ -234,10 +306,83 @@ class AnswerList(APIView):
 
     def get(self, request):
         try:
-            user_answers = Answer.objects.all() if request.user.is_staff \
-                else Answer.objects.filter(user__id=request.user.id)
+            answers = Answer.objects.filter(question__deleted_at__isnull=True,
+                                            question__poll__deleted_at__isnull=True)
+            user_answers = answers if request.user.is_staff \
+                else answers.filter(user__id=request.user.id)
             serializer = AnswerSerializer(user_answers, many=True)
             return Response(data=serializer.data)
         except Answer.DoesNotExist:
             return Response(data={"detail": "No data found for this user."}, status=status.HTTP_400_BAD_REQUEST)
 
+
+class AnswerSearch(generics.ListAPIView):
+    """Ranked full-text search over text answers of a poll or of one of its questions.
+
+    Query params: `q` - keywords or phrase, `type` - `plain` (all words) or `phrase`.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = AnswerSearchSerializer
+    pagination_class = SearchCursorPagination
+    search_types = ('plain', 'phrase')
+
+    def get_queryset(self):
+        keywords = self.request.query_params.get('q', '').strip()
+        search_type = self.request.query_params.get('type', 'plain')
+        if not keywords:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        if search_type not in self.search_types:
+            raise ValidationError({'type': 'Must be one of: {}.'.format(', '.join(self.search_types))})
+
+        try:
+            poll = Poll.objects.get(pk=self.kwargs['poll_id'])
+        except Poll.DoesNotExist:
+            raise Http404
+
+        if 'question_number' in self.kwargs:
+            question = PollQuestionDetail.get_question(poll, self.kwargs['question_number'])
+            if question.type.upper() != TEXT:
+                raise ValidationError({'detail': 'Only answers to text questions can be searched.'})
+            answers = Answer.objects.filter(question=question)
+        else:
+            answers = Answer.objects.filter(question__poll=poll, question__deleted_at__isnull=True,
+                                            question__type__iexact=TEXT)
+
+        query = SearchQuery(keywords, config=SEARCH_CONFIG, search_type=search_type)
+        # ts_rank is a float4, its exact integer scaling is used as the pagination key
+        rank_key = Cast(ExpressionWrapper(F('rank') * Value(1000000.0), output_field=FloatField()), IntegerField())
+        return answers.filter(search_vector=query) \
+            .annotate(rank=SearchRank(F('search_vector'), query)) \
+            .annotate(rank_key=rank_key) \
+            .select_related('question', 'user')
+
+
+class PollCrosstab(APIView):
+    """Respondents of each choice of question `q1` broken down by their choices of question `q2`.
+
+    Questions are given by their numbers in the poll, `group` optionally limits
+    respondents to the members of an auth group.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @staticmethod
+    def int_param(request, name, required=True):
+        value = request.query_params.get(name)
+        if value is None and not required:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValidationError({name: 'A valid integer is required.'})
+
+    def get(self, request, poll_id):
+        q1 = self.int_param(request, 'q1')
+        q2 = self.int_param(request, 'q2')
+        group_id = self.int_param(request, 'group', required=False)
+
+        try:
+            poll = Poll.objects.get(pk=poll_id)
+        except Poll.DoesNotExist:
+            raise Http404
+
+        return Response(data=crosstab(poll, q1, q2, group_id))
@@ -1,5 +1,8 @@
 #!/usr/bin/env sh
 
 python ./manage.py migrate
+python ./manage.py createcachetable
 python ./manage.py collectstatic --noinput
+# removes soft-deleted polls and questions in the background
+python ./manage.py purge_deleted_polls --interval 60 &
 gunicorn --forwarded-allow-ips=* --bind 0.0.0.0:8000 -w 2 pollsapi.wsgi:application